@@ -1,23 +1,55 @@
 const fs = require("node:fs/promises");
 
+// The store only changes when the admin dashboard edits agents, so requests
+// reuse the parsed copy and only re-read the file after its mtime changes.
+// The mtime is checked at most every RECHECK_INTERVAL_MS, so dashboard edits
+// can take that long to reach the callbot.
+const RECHECK_INTERVAL_MS = 5_000;
+
 class AgentDirectory {
   constructor(storePath, logger) {
     this.storePath = storePath;
     this.logger = logger;
+    this.cached = null;
+    this.loading = null;
   }
 
-  async listAgents() {
+  async loadAgents() {
     try {
+      const stat = await fs.stat(this.storePath);
+      if (this.cached && this.cached.mtimeMs === stat.mtimeMs) {
+        return this.cached.agents;
+      }
+
       const raw = await fs.readFile(this.storePath, "utf8");
       const parsed = JSON.parse(raw);
       const agents = Array.isArray(parsed?.agents) ? parsed.agents : [];
+      this.cached = { agents, mtimeMs: stat.mtimeMs, checkedAt: 0 };
       return agents;
     } catch (error) {
       this.logger?.debug({ err: error, path: this.storePath }, "Agent store read skipped");
+      this.cached = null;
       return [];
     }
   }
 
+  async listAgents() {
+    if (this.cached && Date.now() - this.cached.checkedAt < RECHECK_INTERVAL_MS) {
+      return this.cached.agents;
+    }
+
+    if (!this.loading) {
+      this.loading = this.loadAgents().finally(() => {
+        if (this.cached) {
+          this.cached.checkedAt = Date.now();
+        }
+        this.loading = null;
+      });
+    }
+
+    return this.loading;
+  }
+
   async resolveVectorStoreId({ agentId, hospitalCode }) {
     if (!agentId && !hospitalCode) {
       return null;
@@ -1,4 +1,15 @@
-const { MEDICAL_ADVICE_PATTERN, handoffMessageFor, sanitizeUserText, stripQueryNoiseTokens } = require("./policy");
+const {
+  HISTORY_SUMMARY_POLICY,
+  MEDICAL_ADVICE_PATTERN,
+  NO_CONTEXT_REPLY_PATTERN,
+  TRANSFER_REPLY_PATTERN,
+  buildHistorySummaryInput,
+  handoffMessageFor,
+  isComplexQuery,
+  promptHistory,
+  sanitizeUserText,
+  stripQueryNoiseTokens
+} = require("./policy");
 
 const SYSTEM_POLICY = [
   "You are a callbot assistant for Near East University Hospital.",
@@ -23,10 +34,6 @@ const SYSTEM_POLICY_STREAM = [
   "Output only the assistant reply text. Do not output JSON."
 ].join(" ");
 
-const NO_CONTEXT_REPLY_PATTERN =
-  /\b(i don't have|i do not have|outside my available information|out of scope|bilgim yok|kapsam(?:ımın)? dışında|bilgiye ulaşılamadı|bulunamadı|bulamadım|mevcut değil|dokümanda yer almıyor)\b/i;
-const TRANSFER_REPLY_PATTERN = /\b(transfer|call center|çağrı merkezi|aktarıyorum|yönlendir(?:in|iyorum))\b/i;
-
 function elapsedMs(start) {
   return Number((performance.now() - start).toFixed(2));
 }
@@ -37,6 +44,14 @@ class AssistantService {
     this.openai = openai;
     this.vectorClient = vectorClient;
     this.logger = logger;
+    this.historyWindowTurns = config.MAX_HISTORY_TURNS;
+  }
+
+  chooseModel(cleanText) {
+    if (this.config.OPENAI_COMPLEX_MODEL && isComplexQuery(cleanText)) {
+      return this.config.OPENAI_COMPLEX_MODEL;
+    }
+    return this.config.OPENAI_MODEL;
   }
 
   buildContext(docs) {
@@ -48,22 +63,57 @@ class AssistantService {
       .join("\n\n");
   }
 
-  buildPromptInput(cleanText, history, filteredDocs) {
-    const safeHistory = (Array.isArray(history) ? history : [])
-      .slice(-this.config.MAX_HISTORY_TURNS * 2)
-      .map((m) => `${m.role}: ${sanitizeUserText(m.content, 400)}`)
-      .join("\n");
+  // Static policy first, then prior turns, then the per-turn snippets, so the
+  // prompt prefix stays byte-identical across turns and hits prompt caching.
+  buildPromptMessages(systemPolicy, cleanText, history, filteredDocs, summary) {
+    const historyMessages = promptHistory(history, this.historyWindowTurns)
+      .map((m) => ({
+        role: m.role === "assistant" ? "assistant" : "user",
+        content: sanitizeUserText(m.content, 400)
+      }));
 
     const context = this.buildContext(filteredDocs);
     return [
-      `Conversation history:\n${safeHistory || "(empty)"}`,
-      `Knowledge snippets:\n${context}`,
-      `User message:\n${cleanText}`,
-      "If answer is not fully grounded in snippets, choose handoff."
-    ].join("\n\n");
+      {
+        role: "system",
+        content: systemPolicy
+      },
+      ...(summary ? [{ role: "system", content: `Prior conversation summary: ${summary}` }] : []),
+      ...historyMessages,
+      {
+        role: "system",
+        content: `Knowledge snippets:\n${context}\n\nIf the answer is not fully grounded in these snippets, choose handoff.`
+      },
+      {
+        role: "user",
+        content: cleanText
+      }
+    ];
+  }
+
+  async summarizeHistory({ previousSummary, turns, signal }) {
+    const completion = await this.openai.chat.completions.create({
+      model: this.config.HISTORY_SUMMARY_MODEL || this.config.OPENAI_MODEL,
+      temperature: 0,
+      max_tokens: 160,
+      messages: [
+        {
+          role: "system",
+          content: HISTORY_SUMMARY_POLICY
+        },
+        {
+          role: "user",
+          content: buildHistorySummaryInput(previousSummary, turns)
+        }
+      ]
+    }, {
+      signal
+    });
+
+    return sanitizeUserText(completion.choices?.[0]?.message?.content, 600);
   }
 
-  async generateReply({ userText, history, debug = false }) {
+  async generateReply({ userText, history, summary, debug = false }) {
     const totalStart = performance.now();
     const cleanStart = performance.now();
     const cleanText = sanitizeUserText(stripQueryNoiseTokens(userText), this.config.MAX_USER_TEXT_CHARS);
@@ -129,11 +179,9 @@ class AssistantService {
       });
     }
 
-    const promptInput = this.buildPromptInput(cleanText, history, filteredDocs);
-
     const openAiStart = performance.now();
     const completion = await this.openai.chat.completions.create({
-      model: this.config.OPENAI_MODEL,
+      model: this.chooseModel(cleanText),
       temperature: 0.1,
       response_format: {
         type: "json_schema",
@@ -162,16 +210,7 @@ class AssistantService {
           }
         }
       },
-      messages: [
-        {
-          role: "system",
-          content: SYSTEM_POLICY
-        },
-        {
-          role: "user",
-          content: promptInput
-        }
-      ]
+      messages: this.buildPromptMessages(SYSTEM_POLICY, cleanText, history, filteredDocs, summary)
     });
     metrics.openai_ms = elapsedMs(openAiStart);
 
@@ -218,7 +257,7 @@ class AssistantService {
     });
   }
 
-  async generateReplyStream({ userText, history, signal, onRetrievalDone, onToken }) {
+  async generateReplyStream({ userText, history, summary, signal, onRetrievalDone, onToken }) {
     const done = typeof onRetrievalDone === "function" ? onRetrievalDone : () => {};
     const token = typeof onToken === "function" ? onToken : () => {};
 
@@ -272,24 +311,15 @@ class AssistantService {
       };
     }
 
-    const promptInput = this.buildPromptInput(cleanText, history, filteredDocs);
     let outputText = "";
 
     try {
       const stream = await this.openai.chat.completions.create({
-        model: this.config.OPENAI_MODEL,
+        model: this.chooseModel(cleanText),
         temperature: 0.1,
+        max_tokens: this.config.OPENAI_MAX_OUTPUT_TOKENS,
         stream: true,
-        messages: [
-          {
-            role: "system",
-            content: SYSTEM_POLICY_STREAM
-          },
-          {
-            role: "user",
-            content: promptInput
-          }
-        ]
+        messages: this.buildPromptMessages(SYSTEM_POLICY_STREAM, cleanText, history, filteredDocs, summary)
       }, {
         signal
       });
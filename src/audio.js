@@ -0,0 +1,65 @@
+// OpenAI/Azure TTS "pcm" output is 24 kHz mono signed 16-bit little-endian.
+// Twilio media streams expect 8 kHz G.711 mu-law, so every 3 input samples
+// (6 bytes) become one output byte.
+const TTS_PCM_SAMPLE_RATE = 24_000;
+const MULAW_SAMPLE_RATE = 8_000;
+const DECIMATION = TTS_PCM_SAMPLE_RATE / MULAW_SAMPLE_RATE;
+const INPUT_FRAME_BYTES = DECIMATION * 2;
+
+// G.711 mu-law as in the reference Sun/ITU encoder (and Python's audioop):
+// the 16-bit sample is reduced to 14 bits, biased, and split into a 3-bit
+// segment and 4-bit mantissa.
+const MULAW_BIAS = 0x21;
+const MULAW_CLIP = 8159;
+const MULAW_SEGMENT_ENDS = [0x3f, 0x7f, 0xff, 0x1ff, 0x3ff, 0x7ff, 0xfff, 0x1fff];
+
+function linearToMulaw(sample) {
+  let magnitude = sample >> 2;
+  let mask = 0xff;
+  if (magnitude < 0) {
+    magnitude = -magnitude;
+    mask = 0x7f;
+  }
+  magnitude = Math.min(magnitude, MULAW_CLIP) + MULAW_BIAS;
+
+  let segment = 0;
+  while (segment < MULAW_SEGMENT_ENDS.length && magnitude > MULAW_SEGMENT_ENDS[segment]) {
+    segment += 1;
+  }
+  if (segment === MULAW_SEGMENT_ENDS.length) {
+    // Clipped samples saturate at the loudest code.
+    return 0x7f ^ mask;
+  }
+
+  return ((segment << 4) | ((magnitude >> (segment + 1)) & 0x0f)) ^ mask;
+}
+
+// Stateful so audio can be converted chunk by chunk as it streams in; bytes
+// that do not fill a whole 3-sample group are carried into the next push.
+function createMulawEncoder() {
+  let carry = Buffer.alloc(0);
+
+  return {
+    push(chunk) {
+      const input = carry.length ? Buffer.concat([carry, chunk]) : chunk;
+      const frames = Math.floor(input.length / INPUT_FRAME_BYTES);
+      const output = Buffer.allocUnsafe(frames);
+
+      for (let i = 0; i < frames; i += 1) {
+        const offset = i * INPUT_FRAME_BYTES;
+        // Averaging the 3 samples is a cheap low-pass before decimation.
+        const sum = input.readInt16LE(offset) + input.readInt16LE(offset + 2) + input.readInt16LE(offset + 4);
+        output[i] = linearToMulaw(Math.round(sum / DECIMATION));
+      }
+
+      carry = Buffer.from(input.subarray(frames * INPUT_FRAME_BYTES));
+      return output;
+    }
+  };
+}
+
+module.exports = {
+  MULAW_SAMPLE_RATE,
+  createMulawEncoder,
+  linearToMulaw
+};
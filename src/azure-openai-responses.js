@@ -1,4 +1,15 @@
-const { MEDICAL_ADVICE_PATTERN, handoffMessageFor, sanitizeUserText, stripQueryNoiseTokens } = require("./policy");
+const {
+  HISTORY_SUMMARY_POLICY,
+  MEDICAL_ADVICE_PATTERN,
+  NO_CONTEXT_REPLY_PATTERN,
+  TRANSFER_REPLY_PATTERN,
+  buildHistorySummaryInput,
+  handoffMessageFor,
+  isComplexQuery,
+  promptHistory,
+  sanitizeUserText,
+  stripQueryNoiseTokens
+} = require("./policy");
 
 const SYSTEM_POLICY = [
   "You are a callbot assistant for Near East University Hospital.",
@@ -10,10 +21,6 @@ const SYSTEM_POLICY = [
   "Keep a calm and concise tone."
 ].join(" ");
 
-const NO_CONTEXT_REPLY_PATTERN =
-  /\b(i don't have|i do not have|outside my available information|out of scope|bilgim yok|kapsam(?:ımın)? dışında|bilgiye ulaşılamadı|bulunamadı|bulamadım|mevcut değil|dokümanda yer almıyor)\b/i;
-const TRANSFER_REPLY_PATTERN = /\b(transfer|call center|çağrı merkezi|aktarıyorum|yönlendir(?:in|iyorum))\b/i;
-
 function elapsedMs(start) {
   return Number((performance.now() - start).toFixed(2));
 }
@@ -179,6 +186,7 @@ class AzureOpenAIResponsesAssistant {
   constructor(config, logger) {
     this.config = config;
     this.logger = logger;
+    this.historyWindowTurns = Math.min(config.MAX_HISTORY_TURNS, config.AZURE_OPENAI_HISTORY_TURNS);
     this.cache = new Map();
     this.inflight = new Map();
   }
@@ -213,18 +221,26 @@ class AzureOpenAIResponsesAssistant {
     }
   }
 
-  buildRequestBody({ userText, history, vectorStoreId, stream = false }) {
-    const historyTurns = (Array.isArray(history) ? history : [])
-      .slice(-Math.min(this.config.MAX_HISTORY_TURNS, this.config.AZURE_OPENAI_HISTORY_TURNS) * 2)
+  buildRequestBody({ userText, history, summary, vectorStoreId, stream = false }) {
+    const historyTurns = promptHistory(history, this.historyWindowTurns)
       .map((m) => ({
         role: m.role === "assistant" ? "assistant" : "user",
         content: sanitizeUserText(m.content, 400)
       }));
 
+    const model =
+      this.config.AZURE_OPENAI_COMPLEX_DEPLOYMENT && isComplexQuery(userText)
+        ? this.config.AZURE_OPENAI_COMPLEX_DEPLOYMENT
+        : this.config.AZURE_OPENAI_CHAT_DEPLOYMENT;
+
     return {
-      model: this.config.AZURE_OPENAI_CHAT_DEPLOYMENT,
+      model,
       instructions: SYSTEM_POLICY,
-      input: [...historyTurns, { role: "user", content: userText }],
+      input: [
+        ...(summary ? [{ role: "system", content: `Prior conversation summary: ${summary}` }] : []),
+        ...historyTurns,
+        { role: "user", content: userText }
+      ],
       temperature: 0,
       max_output_tokens: this.config.AZURE_OPENAI_MAX_OUTPUT_TOKENS,
       stream,
@@ -243,14 +259,14 @@ class AzureOpenAIResponsesAssistant {
     return `${endpoint}/openai/responses?api-version=${encodeURIComponent(this.config.AZURE_OPENAI_RESPONSES_API_VERSION)}`;
   }
 
-  async createResponse({ userText, history, vectorStoreId, signal }) {
+  async createResponse({ userText, history, summary, vectorStoreId, signal }) {
     const response = await fetch(this.requestUrl(), {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
         "api-key": this.config.AZURE_OPENAI_API_KEY
       },
-      body: JSON.stringify(this.buildRequestBody({ userText, history, vectorStoreId, stream: false })),
+      body: JSON.stringify(this.buildRequestBody({ userText, history, summary, vectorStoreId, stream: false })),
       signal: combineSignalWithTimeout(signal, this.config.AZURE_OPENAI_REQUEST_TIMEOUT_MS)
     });
 
@@ -262,14 +278,14 @@ class AzureOpenAIResponsesAssistant {
     return response.json();
   }
 
-  async createResponseStream({ userText, history, vectorStoreId, signal }) {
+  async createResponseStream({ userText, history, summary, vectorStoreId, signal }) {
     const response = await fetch(this.requestUrl(), {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
         "api-key": this.config.AZURE_OPENAI_API_KEY
       },
-      body: JSON.stringify(this.buildRequestBody({ userText, history, vectorStoreId, stream: true })),
+      body: JSON.stringify(this.buildRequestBody({ userText, history, summary, vectorStoreId, stream: true })),
       signal: combineSignalWithTimeout(signal, this.config.AZURE_OPENAI_REQUEST_TIMEOUT_MS)
     });
 
@@ -285,7 +301,32 @@ class AzureOpenAIResponsesAssistant {
     return response.body;
   }
 
-  async generateReply({ userText, history, vectorStoreId, bypassCache = false, debug = false }) {
+  async summarizeHistory({ previousSummary, turns, signal }) {
+    const response = await fetch(this.requestUrl(), {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        "api-key": this.config.AZURE_OPENAI_API_KEY
+      },
+      body: JSON.stringify({
+        model: this.config.HISTORY_SUMMARY_MODEL || this.config.AZURE_OPENAI_CHAT_DEPLOYMENT,
+        instructions: HISTORY_SUMMARY_POLICY,
+        input: buildHistorySummaryInput(previousSummary, turns),
+        temperature: 0,
+        max_output_tokens: 160
+      }),
+      signal: combineSignalWithTimeout(signal, this.config.AZURE_OPENAI_REQUEST_TIMEOUT_MS)
+    });
+
+    if (!response.ok) {
+      const text = await response.text();
+      throw new Error(`Azure OpenAI summary request failed (${response.status}): ${text.slice(0, 300)}`);
+    }
+
+    return sanitizeUserText(extractOutputText(await response.json()), 600);
+  }
+
+  async generateReply({ userText, history, summary, vectorStoreId, bypassCache = false, debug = false }) {
     const totalStart = performance.now();
     const cleanStart = performance.now();
     const cleanText = sanitizeUserText(stripQueryNoiseTokens(userText), this.config.MAX_USER_TEXT_CHARS);
@@ -343,7 +384,7 @@ class AzureOpenAIResponsesAssistant {
       let responseJson;
       try {
         const azureStart = performance.now();
-        responseJson = await this.createResponse({ userText: cleanText, history, vectorStoreId });
+        responseJson = await this.createResponse({ userText: cleanText, history, summary, vectorStoreId });
         metrics.azure_ms = elapsedMs(azureStart);
       } catch (error) {
         metrics.azure_ms = metrics.azure_ms ?? 0;
@@ -401,7 +442,7 @@ class AzureOpenAIResponsesAssistant {
     }
   }
 
-  async generateReplyStream({ userText, history, vectorStoreId, signal, onRetrievalDone, onToken }) {
+  async generateReplyStream({ userText, history, summary, vectorStoreId, signal, onRetrievalDone, onToken }) {
     const done = typeof onRetrievalDone === "function" ? onRetrievalDone : () => {};
     const token = typeof onToken === "function" ? onToken : () => {};
 
@@ -437,7 +478,7 @@ class AzureOpenAIResponsesAssistant {
     let outputText = "";
 
     try {
-      const stream = await this.createResponseStream({ userText: cleanText, history, vectorStoreId, signal });
+      const stream = await this.createResponseStream({ userText: cleanText, history, summary, vectorStoreId, signal });
 
       for await (const event of readSseEvents(stream, signal)) {
         if (event.done) {
@@ -1,3 +1,5 @@
+const os = require("node:os");
+
 const dotenv = require("dotenv");
 const { z } = require("zod");
 
@@ -10,15 +12,19 @@ const envSchema = z
     NODE_ENV: z.enum(["development", "test", "production"]).default("development"),
     HOST: z.string().default("0.0.0.0"),
     PORT: z.coerce.number().int().min(1).max(65535).default(8765),
+    CLUSTER_WORKERS: z.coerce.number().int().min(0).max(64).default(1),
     LOG_LEVEL: z
       .enum(["fatal", "error", "warn", "info", "debug", "trace", "silent"])
       .default("info"),
+    LOG_ASYNC: z.stringbool().default(true),
 
     SERVICE_API_TOKEN: z.string().min(32).optional(),
     INBOUND_WS_AUTH_TOKEN: z.string().min(32).optional(),
 
     OPENAI_API_KEY: z.string().optional(),
     OPENAI_MODEL: z.string().default("gpt-4.1-mini"),
+    OPENAI_COMPLEX_MODEL: z.string().min(1).optional(),
+    OPENAI_MAX_OUTPUT_TOKENS: z.coerce.number().int().min(32).max(800).default(120),
     OPENAI_EMBEDDING_MODEL: z.string().default("text-embedding-3-small"),
 
     AZURE_SEARCH_ENDPOINT: z.string().optional(),
@@ -37,6 +43,7 @@ const envSchema = z
     AZURE_OPENAI_API_KEY: z.string().optional(),
     AZURE_OPENAI_RESPONSES_API_VERSION: z.string().default("2025-04-01-preview"),
     AZURE_OPENAI_CHAT_DEPLOYMENT: z.string().min(1).optional(),
+    AZURE_OPENAI_COMPLEX_DEPLOYMENT: z.string().min(1).optional(),
     AZURE_OPENAI_FILE_SEARCH_TOP_K: z.coerce.number().int().min(1).max(20).default(3),
     AZURE_OPENAI_MAX_OUTPUT_TOKENS: z.coerce.number().int().min(32).max(800).default(120),
     AZURE_OPENAI_REQUEST_TIMEOUT_MS: z.coerce.number().int().min(2000).max(30000).default(8000),
@@ -44,10 +51,16 @@ const envSchema = z
     AZURE_OPENAI_CACHE_TTL_MS: z.coerce.number().int().min(0).max(600000).default(120000),
     AZURE_OPENAI_CACHE_MAX_ENTRIES: z.coerce.number().int().min(10).max(5000).default(500),
     AZURE_OPENAI_VECTOR_STORE_ID: z.string().min(1).optional(),
+    AZURE_OPENAI_TTS_DEPLOYMENT: z.string().min(1).optional(),
+    AZURE_OPENAI_TTS_VOICE: z.string().default("nova"),
+    AZURE_OPENAI_TTS_API_VERSION: z.string().default("2025-03-01-preview"),
+    AZURE_OPENAI_TTS_CACHE_MAX_ENTRIES: z.coerce.number().int().min(0).max(5000).default(256),
     AGENTS_STORE_PATH: z.string().default("/app/agents/agents.json"),
 
     MAX_USER_TEXT_CHARS: z.coerce.number().int().min(50).max(2000).default(600),
     MAX_HISTORY_TURNS: z.coerce.number().int().min(1).max(25).default(10),
+    HISTORY_SUMMARY_ENABLED: z.stringbool().default(true),
+    HISTORY_SUMMARY_MODEL: z.string().min(1).optional(),
 
     RATE_LIMIT_MAX: z.coerce.number().int().min(1).max(1000).default(60),
 
@@ -55,6 +68,8 @@ const envSchema = z
     DEEPGRAM_LISTEN_URL: z
       .string()
       .default("wss://api.deepgram.com/v1/listen?punctuate=true&interim_results=false"),
+    TRANSCRIPT_DEBOUNCE_MS: z.coerce.number().int().min(0).max(2000).default(300),
+    DEEPGRAM_WARM_POOL_SIZE: z.coerce.number().int().min(0).max(16).default(2),
 
     HUMAN_HANDOFF_WEBHOOK_URL: z.url().optional()
   })
@@ -115,6 +130,24 @@ const envSchema = z
       }
     }
 
+    if (data.AZURE_OPENAI_TTS_DEPLOYMENT) {
+      if (!data.AZURE_OPENAI_API_KEY || data.AZURE_OPENAI_API_KEY.length < 20) {
+        ctx.addIssue({
+          code: z.ZodIssueCode.custom,
+          message: "AZURE_OPENAI_API_KEY is required when AZURE_OPENAI_TTS_DEPLOYMENT is set",
+          path: ["AZURE_OPENAI_API_KEY"]
+        });
+      }
+      const endpoint = data.AZURE_OPENAI_ENDPOINT || data.OPENAI_ENDPOINT;
+      if (!endpoint || !isValidUrl(endpoint)) {
+        ctx.addIssue({
+          code: z.ZodIssueCode.custom,
+          message: "A valid AZURE_OPENAI_ENDPOINT/OPENAI_ENDPOINT is required when AZURE_OPENAI_TTS_DEPLOYMENT is set",
+          path: ["AZURE_OPENAI_ENDPOINT"]
+        });
+      }
+    }
+
     if (data.RAG_BACKEND === "azure_openai_responses") {
       if (!data.AZURE_OPENAI_API_KEY || data.AZURE_OPENAI_API_KEY.length < 20) {
         ctx.addIssue({
@@ -152,7 +185,8 @@ if (!parsed.success) {
 const config = Object.freeze({
   ...parsed.data,
   AZURE_OPENAI_ENDPOINT: parsed.data.AZURE_OPENAI_ENDPOINT || parsed.data.OPENAI_ENDPOINT || "",
-  AZURE_OPENAI_CHAT_DEPLOYMENT: parsed.data.AZURE_OPENAI_CHAT_DEPLOYMENT || parsed.data.OPENAI_MODEL
+  AZURE_OPENAI_CHAT_DEPLOYMENT: parsed.data.AZURE_OPENAI_CHAT_DEPLOYMENT || parsed.data.OPENAI_MODEL,
+  CLUSTER_WORKER_COUNT: parsed.data.CLUSTER_WORKERS === 0 ? os.availableParallelism() : parsed.data.CLUSTER_WORKERS
 });
 
 module.exports = { config };
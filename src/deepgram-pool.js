@@ -0,0 +1,123 @@
+const WebSocket = require("ws");
+
+const KEEPALIVE_INTERVAL_MS = 5_000;
+const KEEPALIVE_MESSAGE = JSON.stringify({ type: "KeepAlive" });
+const REDIAL_DELAY_MS = 5_000;
+
+// Keeps a few Deepgram listen sockets dialed ahead of time so a new call can
+// start streaming audio immediately instead of waiting on TLS + WS handshakes.
+// Deepgram closes idle streams after ~10s, so idle sockets are kept alive.
+class DeepgramConnectionPool {
+  constructor({ apiKey, url, size, maxPayload, logger }) {
+    this.apiKey = apiKey;
+    this.url = url;
+    this.size = apiKey ? size : 0;
+    this.maxPayload = maxPayload;
+    this.logger = logger;
+    this.idle = [];
+    this.redialTimer = null;
+    this.closed = false;
+  }
+
+  dial(url) {
+    return new WebSocket(url, {
+      headers: {
+        Authorization: `Token ${this.apiKey}`
+      },
+      handshakeTimeout: 7_000,
+      maxPayload: this.maxPayload,
+      // Audio is near-incompressible; deflate would only burn CPU.
+      perMessageDeflate: false
+    });
+  }
+
+  start() {
+    this.replenish();
+  }
+
+  replenish() {
+    while (!this.closed && this.idle.length < this.size) {
+      this.idle.push(this.warm());
+    }
+  }
+
+  warm() {
+    const entry = {
+      socket: this.dial(this.url),
+      keepAliveTimer: null,
+      onOpen: null,
+      onGone: null
+    };
+
+    entry.onOpen = () => {
+      entry.keepAliveTimer = setInterval(() => {
+        if (entry.socket.readyState === WebSocket.OPEN) {
+          entry.socket.send(KEEPALIVE_MESSAGE);
+        }
+      }, KEEPALIVE_INTERVAL_MS);
+      entry.keepAliveTimer.unref();
+    };
+
+    entry.onGone = (error) => {
+      if (error instanceof Error) {
+        this.logger?.warn({ err: error }, "Warm Deepgram socket failed");
+      }
+      this.release(entry);
+      const index = this.idle.indexOf(entry);
+      if (index !== -1) {
+        this.idle.splice(index, 1);
+      }
+      this.scheduleRedial();
+    };
+
+    entry.socket.on("open", entry.onOpen);
+    entry.socket.on("error", entry.onGone);
+    entry.socket.on("close", entry.onGone);
+    return entry;
+  }
+
+  release(entry) {
+    clearInterval(entry.keepAliveTimer);
+    entry.socket.off("open", entry.onOpen);
+    entry.socket.off("error", entry.onGone);
+    entry.socket.off("close", entry.onGone);
+  }
+
+  scheduleRedial() {
+    if (this.closed || this.redialTimer) {
+      return;
+    }
+
+    // Back off so a bad key or network outage does not turn into a dial loop.
+    this.redialTimer = setTimeout(() => {
+      this.redialTimer = null;
+      this.replenish();
+    }, REDIAL_DELAY_MS);
+    this.redialTimer.unref();
+  }
+
+  // Returns an open pooled socket for the pool URL, or dials a fresh one.
+  acquire() {
+    const index = this.idle.findIndex((entry) => entry.socket.readyState === WebSocket.OPEN);
+    if (index !== -1) {
+      const [entry] = this.idle.splice(index, 1);
+      this.release(entry);
+      this.replenish();
+      return entry.socket;
+    }
+
+    return this.dial(this.url);
+  }
+
+  close() {
+    this.closed = true;
+    clearTimeout(this.redialTimer);
+    for (const entry of this.idle.splice(0)) {
+      this.release(entry);
+      entry.socket.on("error", () => {});
+      entry.socket.terminate();
+    }
+  }
+}
+
+module.exports = { DeepgramConnectionPool };
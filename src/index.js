@@ -1,3 +1,7 @@
+const cluster = require("node:cluster");
+
+const pino = require("pino");
+
 const { config } = require("./config");
 const { buildServer } = require("./server");
 
@@ -6,7 +10,7 @@ async function start() {
 
   try {
     await app.listen({ host: config.HOST, port: config.PORT });
-    app.log.info({ host: config.HOST, port: config.PORT }, "Callbot service started");
+    app.log.info({ host: config.HOST, port: config.PORT, pid: process.pid }, "Callbot service started");
   } catch (error) {
     app.log.fatal({ err: error }, "Failed to start server");
     process.exit(1);
@@ -27,4 +31,76 @@ async function start() {
   process.on("SIGTERM", () => shutdown("SIGTERM"));
 }
 
-start();
+// Restarts back off exponentially; a worker that keeps dying (bad port,
+// missing file, ...) makes the primary give up instead of fork-looping.
+const WORKER_RESTART_BASE_DELAY_MS = 1_000;
+const WORKER_RESTART_MAX_DELAY_MS = 30_000;
+const WORKER_CRASH_WINDOW_MS = 60_000;
+const WORKER_MAX_CRASHES_PER_WINDOW = 5;
+
+// One worker per core sharing the listening port. Call state lives on each
+// websocket connection, so workers need no shared memory.
+function startPrimary(workerCount) {
+  const logger = pino({ level: config.LOG_LEVEL });
+  let shuttingDown = false;
+  let exitCode = 0;
+  let recentCrashes = [];
+
+  for (let i = 0; i < workerCount; i += 1) {
+    cluster.fork();
+  }
+
+  cluster.on("exit", (worker, code, signal) => {
+    if (shuttingDown) {
+      if (Object.keys(cluster.workers).length === 0) {
+        process.exit(exitCode);
+      }
+      return;
+    }
+
+    const now = Date.now();
+    recentCrashes = recentCrashes.filter((at) => now - at < WORKER_CRASH_WINDOW_MS);
+    recentCrashes.push(now);
+
+    if (recentCrashes.length > WORKER_MAX_CRASHES_PER_WINDOW) {
+      logger.fatal(
+        { pid: worker.process.pid, code, signal, crashes: recentCrashes.length, windowMs: WORKER_CRASH_WINDOW_MS },
+        "Callbot workers are crashing repeatedly; giving up"
+      );
+      exitCode = 1;
+      shutdown("SIGTERM");
+      return;
+    }
+
+    const delayMs = Math.min(
+      WORKER_RESTART_MAX_DELAY_MS,
+      WORKER_RESTART_BASE_DELAY_MS * 2 ** (recentCrashes.length - 1)
+    );
+    logger.error({ pid: worker.process.pid, code, signal, restartInMs: delayMs }, "Callbot worker exited; restarting");
+    setTimeout(() => {
+      if (!shuttingDown) {
+        cluster.fork();
+      }
+    }, delayMs);
+  });
+
+  const shutdown = (signal) => {
+    shuttingDown = true;
+    const workers = Object.values(cluster.workers);
+    if (workers.length === 0) {
+      process.exit(exitCode);
+    }
+    for (const worker of workers) {
+      worker.process.kill(signal);
+    }
+  };
+
+  process.on("SIGINT", () => shutdown("SIGINT"));
+  process.on("SIGTERM", () => shutdown("SIGTERM"));
+}
+
+if (cluster.isPrimary && config.CLUSTER_WORKER_COUNT > 1) {
+  startPrimary(config.CLUSTER_WORKER_COUNT);
+} else {
+  start();
+}
@@ -0,0 +1,108 @@
+// Twilio sends 20 ms / 160 byte frames of 8 kHz mu-law; forward 100 ms at a time.
+const TWILIO_AUDIO_BATCH_BYTES = 800;
+const TWILIO_AUDIO_BATCH_MAX_DELAY_MS = 100;
+const TWILIO_MEDIA_EVENT_MARKER = Buffer.from('"event":"media"');
+const TWILIO_PAYLOAD_MARKER = Buffer.from('"payload":"');
+const DEEPGRAM_TRANSCRIPT_MARKER = Buffer.from('"transcript"');
+const DEEPGRAM_EMPTY_TRANSCRIPT_MARKER = Buffer.from('"alternatives":[{"transcript":""');
+const DEEPGRAM_NOT_FINAL_MARKER = Buffer.from('"is_final":false');
+
+// Twilio sends ~50 media frames per second per call. Pull the base64 payload
+// straight out of the raw frame instead of decoding and JSON-parsing it;
+// returns null when the frame does not look like a plain media event.
+function extractTwilioMediaAudio(raw) {
+  if (!Buffer.isBuffer(raw) || raw.indexOf(TWILIO_MEDIA_EVENT_MARKER) === -1) {
+    return null;
+  }
+
+  const markerIndex = raw.indexOf(TWILIO_PAYLOAD_MARKER);
+  if (markerIndex === -1) {
+    return null;
+  }
+
+  const payloadStart = markerIndex + TWILIO_PAYLOAD_MARKER.length;
+  const payloadEnd = raw.indexOf(0x22, payloadStart);
+  if (payloadEnd === -1) {
+    return null;
+  }
+
+  return Buffer.from(raw.toString("latin1", payloadStart, payloadEnd), "base64");
+}
+
+// Deepgram also sends metadata, speech-started events and empty results.
+// Rule those out on the raw bytes; anything not recognized is parsed as usual.
+function isUsefulDeepgramMessage(raw, { finalOnly = false } = {}) {
+  if (!Buffer.isBuffer(raw)) {
+    return true;
+  }
+
+  if (raw.indexOf(DEEPGRAM_TRANSCRIPT_MARKER) === -1 || raw.indexOf(DEEPGRAM_EMPTY_TRANSCRIPT_MARKER) !== -1) {
+    return false;
+  }
+
+  return !(finalOnly && raw.indexOf(DEEPGRAM_NOT_FINAL_MARKER) !== -1);
+}
+
+// Outbound media messages differ only in their payload, so build the JSON
+// around it once per stream instead of serializing an object per chunk.
+function createMediaFrameEncoder(streamSid) {
+  const prefix = `{"event":"media","streamSid":${JSON.stringify(streamSid)},"media":{"payload":"`;
+  const suffix = '"}}';
+  return (audio) => prefix + audio.toString("base64") + suffix;
+}
+
+function createAudioBatcher(onFlush, options = {}) {
+  const maxBytes = Number.isInteger(options.maxBytes) ? options.maxBytes : TWILIO_AUDIO_BATCH_BYTES;
+  const maxDelayMs = Number.isInteger(options.maxDelayMs) ? options.maxDelayMs : TWILIO_AUDIO_BATCH_MAX_DELAY_MS;
+  const buffer = Buffer.allocUnsafe(maxBytes);
+  let length = 0;
+  let timer = null;
+
+  const flush = () => {
+    if (timer) {
+      clearTimeout(timer);
+      timer = null;
+    }
+    if (!length) {
+      return;
+    }
+
+    // Copy out: the staging buffer is reused while ws may still hold the chunk.
+    const chunk = Buffer.from(buffer.subarray(0, length));
+    length = 0;
+    onFlush(chunk);
+  };
+
+  return {
+    push(audio) {
+      let offset = 0;
+      while (offset < audio.length) {
+        const copied = audio.copy(buffer, length, offset);
+        length += copied;
+        offset += copied;
+        if (length >= maxBytes) {
+          flush();
+        }
+      }
+
+      if (length && !timer) {
+        timer = setTimeout(flush, maxDelayMs);
+      }
+    },
+    flush,
+    clear() {
+      if (timer) {
+        clearTimeout(timer);
+        timer = null;
+      }
+      length = 0;
+    }
+  };
+}
+
+module.exports = {
+  createAudioBatcher,
+  createMediaFrameEncoder,
+  extractTwilioMediaAudio,
+  isUsefulDeepgramMessage
+};
@@ -5,12 +5,37 @@ const HANDOFF_MESSAGE_EN =
 
 const MEDICAL_ADVICE_PATTERN =
   /\b(tedavi|ila[cç]|doz|re[cç]ete|tan[ıi]|te[sş]his|ameliyat|yan etki|treatment|medicine|medication|dosage|prescription|diagnosis|drug|side effects?)\b/i;
+const NO_CONTEXT_REPLY_PATTERN =
+  /\b(i don't have|i do not have|outside my available information|out of scope|bilgim yok|kapsam(?:ımın)? dışında|bilgiye ulaşılamadı|bulunamadı|bulamadım|mevcut değil|dokümanda yer almıyor)\b/i;
+const TRANSFER_REPLY_PATTERN = /\b(transfer|call center|çağrı merkezi|aktarıyorum|yönlendir(?:in|iyorum))\b/i;
+
+// Questions that usually need more reasoning than the small default model
+// handles well; only these are escalated to the larger model when configured.
+// Cues are whole words or phrases: bare "why"/"neden" or "adım" ("my name")
+// appear in too many routine turns. \b is ASCII-only, so Turkish cues are
+// bounded by explicit non-letter lookarounds.
+const COMPLEX_QUERY_PATTERN =
+  /\b(?:compare|comparison|difference between|what is the difference|explain in detail|step by step)\b|(?<![\p{L}])(?:karşılaştır\p{L}*|farkı nedir|farkı ne|arasındaki fark\p{L}*|adım adım|ayrıntılı açıkla\p{L}*)(?![\p{L}])/iu;
+const COMPLEX_QUERY_MIN_CHARS = 200;
+
+const HISTORY_SUMMARY_POLICY = [
+  "You compress earlier turns of a hospital callbot conversation into a short memory note.",
+  "Keep it under 80 tokens.",
+  "Preserve names, numbers, dates, departments, appointments, and anything the assistant promised.",
+  "Merge the previous summary with the new turns instead of repeating it.",
+  "Write in the same language as the conversation. Output only the summary text."
+].join(" ");
 
 function isLikelyTurkish(text) {
   if (!text) return false;
   return /[çğıöşüÇĞİÖŞÜ]|\b(merhaba|randevu|hastane|doktor|hangi|nas[ıi]l|neden|lütfen|için|m[ıi]|mi)\b/i.test(text);
 }
 
+function isComplexQuery(text) {
+  const value = String(text ?? "");
+  return value.length > COMPLEX_QUERY_MIN_CHARS || COMPLEX_QUERY_PATTERN.test(value);
+}
+
 function handoffMessageFor(text) {
   return isLikelyTurkish(text) ? HANDOFF_MESSAGE_TR : HANDOFF_MESSAGE_EN;
 }
@@ -28,6 +53,29 @@ function sanitizeUserText(text, maxChars) {
   return normalized.slice(0, maxChars);
 }
 
+function buildHistorySummaryInput(previousSummary, turns) {
+  const transcript = (Array.isArray(turns) ? turns : [])
+    .map((m) => `${m.role === "assistant" ? "assistant" : "user"}: ${sanitizeUserText(m.content, 400)}`)
+    .join("\n");
+
+  return [`Previous summary:\n${previousSummary || "(none)"}`, `New turns:\n${transcript}`].join("\n\n");
+}
+
+// The last windowTurns exchanges sent as prompt history; older turns reach
+// the model only through the session summary.
+function promptHistory(history, windowTurns) {
+  const turns = Array.isArray(history) ? history : [];
+  return windowTurns > 0 ? turns.slice(-windowTurns * 2) : [];
+}
+
+// Replies (or parts of them) that must not reach the caller and turn the
+// whole turn into a handoff.
+function requiresHandoff(text) {
+  return (
+    MEDICAL_ADVICE_PATTERN.test(text) || NO_CONTEXT_REPLY_PATTERN.test(text) || TRANSFER_REPLY_PATTERN.test(text)
+  );
+}
+
 function stripQueryNoiseTokens(text) {
   const value = String(text ?? "");
   const cleaned = value
@@ -50,9 +98,16 @@ function stripQueryNoiseTokens(text) {
 module.exports = {
   HANDOFF_MESSAGE_TR,
   HANDOFF_MESSAGE_EN,
+  HISTORY_SUMMARY_POLICY,
   MEDICAL_ADVICE_PATTERN,
+  NO_CONTEXT_REPLY_PATTERN,
+  TRANSFER_REPLY_PATTERN,
+  buildHistorySummaryInput,
   handoffMessageFor,
+  isComplexQuery,
   isLikelyTurkish,
+  promptHistory,
+  requiresHandoff,
   sanitizeUserText,
   stripQueryNoiseTokens
 };
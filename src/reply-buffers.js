@@ -0,0 +1,90 @@
+function createPhraseBuffer(onFlush, options = {}) {
+  const minWords = Number.isInteger(options.minWords) ? options.minWords : 10;
+  const maxWords = Number.isInteger(options.maxWords) ? options.maxWords : 20;
+  let buffer = "";
+
+  const countWords = (value) => {
+    const trimmed = value.trim();
+    if (!trimmed) return 0;
+    return trimmed.split(/\s+/).length;
+  };
+
+  const flushWords = (wordCount) => {
+    const words = buffer.trim().split(/\s+/);
+    if (!words.length) {
+      return;
+    }
+
+    const take = Math.min(wordCount, words.length);
+    const head = words.slice(0, take).join(" ");
+    const tail = words.slice(take).join(" ");
+
+    buffer = tail ? `${tail} ` : "";
+    onFlush(head);
+  };
+
+  return {
+    push(chunk) {
+      if (typeof chunk !== "string" || !chunk) {
+        return;
+      }
+
+      buffer += chunk;
+      const words = countWords(buffer);
+      if (words < minWords) {
+        return;
+      }
+
+      const shouldFlushEarly = /[.!?]\s$/.test(buffer);
+      if (shouldFlushEarly || words >= maxWords) {
+        flushWords(shouldFlushEarly ? words : maxWords);
+      }
+    },
+    flush() {
+      const words = countWords(buffer);
+      if (words === 0) {
+        return;
+      }
+      flushWords(words);
+    }
+  };
+}
+
+// Splits streamed model output into sentences so each one can be sent to TTS
+// as soon as it is complete instead of waiting for the whole reply.
+function createSentenceBuffer(onSentence) {
+  const boundary = /[.!?…](?=\s)|\n/;
+  let buffer = "";
+
+  return {
+    push(chunk) {
+      if (typeof chunk !== "string" || !chunk) {
+        return;
+      }
+
+      buffer += chunk;
+      let match = boundary.exec(buffer);
+      while (match) {
+        const end = match.index + match[0].length;
+        const sentence = buffer.slice(0, end).trim();
+        buffer = buffer.slice(end);
+        if (sentence) {
+          onSentence(sentence);
+        }
+        match = boundary.exec(buffer);
+      }
+    },
+    flush() {
+      const rest = buffer.trim();
+      buffer = "";
+      if (rest) {
+        onSentence(rest);
+      }
+    },
+    clear() {
+      buffer = "";
+    }
+  };
+}
+
+module.exports = { createPhraseBuffer, createSentenceBuffer };
@@ -15,9 +15,22 @@ const { SessionStore } = require("./session-store");
 const { notifyHandoff } = require("./handoff");
 const { AgentDirectory } = require("./agent-directory");
 const { setupSse, writeSseEvent, endSse } = require("./sse");
+const { DeepgramConnectionPool } = require("./deepgram-pool");
+const { SpeechSynthesizer } = require("./tts");
+const { createTurnQueue } = require("./turn-queue");
+const {
+  createAudioBatcher,
+  createMediaFrameEncoder,
+  extractTwilioMediaAudio,
+  isUsefulDeepgramMessage
+} = require("./media-frames");
+const { createPhraseBuffer, createSentenceBuffer } = require("./reply-buffers");
+const { handoffMessageFor, requiresHandoff } = require("./policy");
 
 const MAX_WS_MESSAGE_BYTES = 1_000_000;
 const MAX_AUDIO_BYTES = 512_000;
+// Outbound speech is sent back to Twilio in 200 ms mu-law media messages.
+const TWILIO_OUTBOUND_CHUNK_BYTES = 1_600;
 const DEFAULT_HANDOFF_REPLY =
   "This topic is outside my available information. I will transfer your call to a human call center agent.";
 
@@ -169,62 +182,13 @@ function normalizeWsRouteArgs(firstArg, secondArg) {
   };
 }
 
-function createPhraseBuffer(onFlush, options = {}) {
-  const minWords = Number.isInteger(options.minWords) ? options.minWords : 10;
-  const maxWords = Number.isInteger(options.maxWords) ? options.maxWords : 20;
-  let buffer = "";
-
-  const countWords = (value) => {
-    const trimmed = value.trim();
-    if (!trimmed) return 0;
-    return trimmed.split(/\s+/).length;
-  };
-
-  const flushWords = (wordCount) => {
-    const words = buffer.trim().split(/\s+/);
-    if (!words.length) {
-      return;
-    }
-
-    const take = Math.min(wordCount, words.length);
-    const head = words.slice(0, take).join(" ");
-    const tail = words.slice(take).join(" ");
-
-    buffer = tail ? `${tail} ` : "";
-    onFlush(head);
-  };
-
-  return {
-    push(chunk) {
-      if (typeof chunk !== "string" || !chunk) {
-        return;
-      }
-
-      buffer += chunk;
-      const words = countWords(buffer);
-      if (words < minWords) {
-        return;
-      }
-
-      const shouldFlushEarly = /[.!?]\s$/.test(buffer);
-      if (shouldFlushEarly || words >= maxWords) {
-        flushWords(shouldFlushEarly ? words : maxWords);
-      }
-    },
-    flush() {
-      const words = countWords(buffer);
-      if (words === 0) {
-        return;
-      }
-      flushWords(words);
-    }
-  };
-}
-
 function buildServer() {
   const app = Fastify({
     logger: {
       level: config.LOG_LEVEL,
+      // Write logs from a pino worker thread so stdout back-pressure never
+      // blocks the event loop that is forwarding call audio.
+      ...(config.LOG_ASYNC ? { transport: { target: "pino/file", options: { destination: 1 } } } : {}),
       redact: {
         paths: [
           "req.headers.authorization",
@@ -256,13 +220,69 @@ function buildServer() {
     assistant = new AzureOpenAIResponsesAssistant(config, app.log);
   }
 
-  const sessionStore = new SessionStore(config.MAX_HISTORY_TURNS);
+  // Size the stored window to what the backend actually sends, so a turn is
+  // summarized as soon as it would otherwise drop out of the prompt.
+  const sessionStore = new SessionStore(assistant.historyWindowTurns);
   const agentDirectory = new AgentDirectory(config.AGENTS_STORE_PATH, app.log);
+  const deepgramPool = new DeepgramConnectionPool({
+    apiKey: config.DEEPGRAM_API_KEY,
+    url: config.DEEPGRAM_LISTEN_URL,
+    // The pool size is per instance; each worker keeps its share of it so
+    // idle sockets do not multiply against the Deepgram concurrency limit.
+    size: Math.ceil(config.DEEPGRAM_WARM_POOL_SIZE / config.CLUSTER_WORKER_COUNT),
+    maxPayload: MAX_WS_MESSAGE_BYTES,
+    logger: app.log
+  });
 
   app.decorate("assistant", assistant);
   app.decorate("vectorClient", vectorClient);
   app.decorate("sessionStore", sessionStore);
   app.decorate("agentDirectory", agentDirectory);
+  app.decorate("deepgramPool", deepgramPool);
+  app.decorate("speechSynthesizer", new SpeechSynthesizer(config, app.log));
+
+  // Turns that fall out of the history window are folded into a rolling
+  // per-session summary in the background so long calls keep caller facts.
+  // Calls are serialized per session; turns evicted while one is running are
+  // merged into the next call. Until a call finishes, its turns are in
+  // neither the prompt window nor the summary.
+  const summarizeEvicted = (sessionId, turns) => {
+    const session = app.sessionStore.get(sessionId);
+    session.pendingSummaryTurns.push(...turns);
+    if (session.summaryTask) {
+      return;
+    }
+
+    session.summaryAbortController ??= new AbortController();
+    const { signal } = session.summaryAbortController;
+    session.summaryTask = (async () => {
+      while (session.pendingSummaryTurns.length && !signal.aborted) {
+        const batch = session.pendingSummaryTurns.splice(0);
+        try {
+          const summary = await app.assistant.summarizeHistory({
+            previousSummary: session.summary,
+            turns: batch,
+            signal
+          });
+          if (summary) {
+            app.sessionStore.setSummary(sessionId, summary);
+          }
+        } catch (error) {
+          if (!signal.aborted) {
+            app.log.warn({ err: error, sessionId }, "History summarization failed");
+          }
+        }
+      }
+      session.summaryTask = null;
+    })();
+  };
+
+  const recordTurn = (sessionId, role, content) => {
+    const evicted = app.sessionStore.addTurn(sessionId, role, content);
+    if (evicted.length && config.HISTORY_SUMMARY_ENABLED) {
+      summarizeEvicted(sessionId, evicted);
+    }
+  };
 
   app.register(helmet, {
     global: true,
@@ -279,7 +299,8 @@ function buildServer() {
 
   app.register(websocket, {
     options: {
-      maxPayload: MAX_WS_MESSAGE_BYTES
+      maxPayload: MAX_WS_MESSAGE_BYTES,
+      perMessageDeflate: false
     }
   });
 
@@ -397,7 +418,8 @@ function buildServer() {
 
   const handleRespond = async (request, { debug = false, body = request.body } = {}) => {
     const sessionId = body.sessionId || crypto.randomUUID();
-    const history = app.sessionStore.get(sessionId).history;
+    const session = app.sessionStore.get(sessionId);
+    const history = session.history;
     const vectorStoreId = await resolveVectorStoreId(body);
     const bypassCache =
       parseBooleanFlag(request.headers["x-bypass-cache"]) || parseBooleanFlag(request.query?.no_cache);
@@ -407,6 +429,7 @@ function buildServer() {
       result = await app.assistant.generateReply({
         userText: body.text,
         history,
+        summary: session.summary,
         vectorStoreId,
         bypassCache,
         debug
@@ -420,8 +443,8 @@ function buildServer() {
       };
     }
 
-    app.sessionStore.addTurn(sessionId, "user", body.text);
-    app.sessionStore.addTurn(sessionId, "assistant", result.reply);
+    recordTurn(sessionId, "user", body.text);
+    recordTurn(sessionId, "assistant", result.reply);
 
     if (result.decision === "handoff") {
       await notifyHandoff(
@@ -454,7 +477,8 @@ function buildServer() {
   const handleRespondStream = async (request, reply, { body }) => {
     const startedAt = performance.now();
     const sessionId = body.sessionId || crypto.randomUUID();
-    const history = app.sessionStore.get(sessionId).history;
+    const session = app.sessionStore.get(sessionId);
+    const history = session.history;
     const vectorStoreId = await resolveVectorStoreId(body);
     const bypassCache =
       parseBooleanFlag(request.headers["x-bypass-cache"]) || parseBooleanFlag(request.query?.no_cache);
@@ -510,6 +534,7 @@ function buildServer() {
       const result = await app.assistant.generateReplyStream({
         userText: body.text,
         history,
+        summary: session.summary,
         vectorStoreId,
         bypassCache,
         signal: abortController.signal,
@@ -532,8 +557,8 @@ function buildServer() {
 
       phraseBuffer.flush();
 
-      app.sessionStore.addTurn(sessionId, "user", body.text);
-      app.sessionStore.addTurn(sessionId, "assistant", result.reply);
+      recordTurn(sessionId, "user", body.text);
+      recordTurn(sessionId, "assistant", result.reply);
 
       if (result.decision === "handoff") {
         await notifyHandoff(
@@ -587,8 +612,8 @@ function buildServer() {
           citations: []
         };
 
-        app.sessionStore.addTurn(sessionId, "user", body.text);
-        app.sessionStore.addTurn(sessionId, "assistant", fallback.reply);
+        recordTurn(sessionId, "user", body.text);
+        recordTurn(sessionId, "assistant", fallback.reply);
         await notifyHandoff(
           config,
           {
@@ -904,16 +929,9 @@ function buildServer() {
             punctuate: true
           });
 
-      const deepgramSocket = new WebSocket(deepgramListenUrl, {
-        headers: {
-          Authorization: `Token ${config.DEEPGRAM_API_KEY}`
-        },
-        handshakeTimeout: 7_000,
-        maxPayload: MAX_WS_MESSAGE_BYTES
-      });
+      const deepgramSocket = app.deepgramPool.dial(deepgramListenUrl);
 
       let closed = false;
-      let queue = Promise.resolve();
       let activeReplyAbortController = null;
 
       const sendSocketEvent = (payload) => {
@@ -927,6 +945,8 @@ function buildServer() {
       const safeClose = () => {
         if (closed) return;
         closed = true;
+        turnQueue.clear();
+        app.sessionStore.delete(sessionId);
 
         if (activeReplyAbortController) {
           activeReplyAbortController.abort(new Error("Websocket closed"));
@@ -944,8 +964,10 @@ function buildServer() {
 
       const handleTranscript = async (transcript) => {
         const startedAt = performance.now();
-        app.sessionStore.addTurn(sessionId, "user", transcript);
-        const history = app.sessionStore.get(sessionId).history;
+        // Snapshot prior turns only; the transcript is sent as the user message.
+        const session = app.sessionStore.get(sessionId);
+        const history = session.history.slice();
+        recordTurn(sessionId, "user", transcript);
         let retrievalDone = false;
         let retrievalMs = null;
         let llmFirstTokenMs = null;
@@ -989,6 +1011,7 @@ function buildServer() {
           result = await app.assistant.generateReplyStream({
             userText: transcript,
             history,
+            summary: session.summary,
             vectorStoreId,
             signal: activeReplyAbortController.signal,
             onRetrievalDone: (payload) => {
@@ -1023,7 +1046,7 @@ function buildServer() {
         }
         phraseBuffer.flush();
 
-        app.sessionStore.addTurn(sessionId, "assistant", result.reply);
+        recordTurn(sessionId, "assistant", result.reply);
 
         sendSocketEvent({
           event: "assistant_response",
@@ -1063,6 +1086,13 @@ function buildServer() {
         }
       };
 
+      const turnQueue = createTurnQueue(handleTranscript, {
+        debounceMs: config.TRANSCRIPT_DEBOUNCE_MS,
+        onError: (error) => {
+          app.log.error({ err: error }, "Deepgram browser transcript queue failed");
+        }
+      });
+
       deepgramSocket.on("open", () => {
         sendSocketEvent({
           event: "ready",
@@ -1071,6 +1101,8 @@ function buildServer() {
       });
 
       deepgramSocket.on("message", (raw) => {
+        if (!isUsefulDeepgramMessage(raw)) return;
+
         const parsed = parseJsonSafe(raw.toString("utf8"));
         if (!parsed) return;
 
@@ -1091,11 +1123,7 @@ function buildServer() {
           return;
         }
 
-        queue = queue
-          .then(() => handleTranscript(transcript))
-          .catch((error) => {
-            app.log.error({ err: error }, "Deepgram browser transcript queue failed");
-          });
+        turnQueue.push(transcript);
       });
 
       deepgramSocket.on("error", (error) => {
@@ -1183,20 +1211,20 @@ function buildServer() {
 
       const sessionId = crypto.randomUUID();
       let streamSid = "";
+      let encodeMediaFrame = null;
       const defaultVectorStoreId = config.AZURE_OPENAI_VECTOR_STORE_ID || null;
 
-      const deepgramSocket = new WebSocket(config.DEEPGRAM_LISTEN_URL, {
-        headers: {
-          Authorization: `Token ${config.DEEPGRAM_API_KEY}`
-        },
-        handshakeTimeout: 7_000,
-        maxPayload: MAX_WS_MESSAGE_BYTES
-      });
+      const deepgramSocket = app.deepgramPool.acquire();
 
       let closed = false;
-      let queue = Promise.resolve();
       let activeReplyAbortController = null;
 
+      const audioBatcher = createAudioBatcher((chunk) => {
+        if (deepgramSocket.readyState === WebSocket.OPEN) {
+          deepgramSocket.send(chunk);
+        }
+      });
+
       const sendSocketEvent = (payload) => {
         if (socket.readyState !== WebSocket.OPEN) {
           return;
@@ -1205,9 +1233,50 @@ function buildServer() {
         socket.send(JSON.stringify(payload));
       };
 
+      const sendMediaAudio = (audio) => {
+        for (let offset = 0; offset < audio.length; offset += TWILIO_OUTBOUND_CHUNK_BYTES) {
+          if (socket.readyState !== WebSocket.OPEN || !encodeMediaFrame) {
+            return;
+          }
+
+          socket.send(encodeMediaFrame(audio.subarray(offset, offset + TWILIO_OUTBOUND_CHUNK_BYTES)));
+        }
+      };
+
+      const speechAbortController = new AbortController();
+      let speechChain = Promise.resolve();
+
+      // Synthesis starts as soon as a sentence is ready so it overlaps with
+      // generation; playback order is kept by chaining the sends.
+      const speak = (text) => {
+        // File-search citation markers (【4:0†source】) must not be read aloud.
+        const spokenText = text.replace(/【[^】]*】/g, " ").replace(/\s+/g, " ").trim();
+        if (!spokenText || !app.speechSynthesizer.enabled || speechAbortController.signal.aborted) {
+          return;
+        }
+
+        const audio = app.speechSynthesizer.synthesizeStream(spokenText, { signal: speechAbortController.signal });
+        audio.catch(() => {});
+        speechChain = speechChain
+          .then(async () => {
+            for await (const chunk of await audio) {
+              sendMediaAudio(chunk);
+            }
+          })
+          .catch((error) => {
+            if (!speechAbortController.signal.aborted) {
+              app.log.error({ err: error }, "Speech synthesis failed");
+            }
+          });
+      };
+
       const safeClose = () => {
         if (closed) return;
         closed = true;
+        turnQueue.clear();
+        app.sessionStore.delete(sessionId);
+        audioBatcher.clear();
+        speechAbortController.abort(new Error("Websocket closed"));
 
         if (activeReplyAbortController) {
           activeReplyAbortController.abort(new Error("Websocket closed"));
@@ -1225,8 +1294,10 @@ function buildServer() {
 
       const handleTranscript = async (transcript) => {
         const startedAt = performance.now();
-        app.sessionStore.addTurn(sessionId, "user", transcript);
-        const history = app.sessionStore.get(sessionId).history;
+        // Snapshot prior turns only; the transcript is sent as the user message.
+        const session = app.sessionStore.get(sessionId);
+        const history = session.history.slice();
+        recordTurn(sessionId, "user", transcript);
         let retrievalDone = false;
         let retrievalMs = null;
         let llmFirstTokenMs = null;
@@ -1247,6 +1318,21 @@ function buildServer() {
           });
         };
 
+        // The backend only vets the finished reply, and a spoken sentence
+        // cannot be taken back, so each sentence is vetted before synthesis.
+        // The first one that fails ends generation and the turn hands off.
+        let heldBack = false;
+        const sentenceBuffer = createSentenceBuffer((sentence) => {
+          if (heldBack) {
+            return;
+          }
+          if (requiresHandoff(sentence)) {
+            heldBack = true;
+            activeReplyAbortController?.abort(new Error("Reply requires handoff"));
+            return;
+          }
+          speak(sentence);
+        });
         const phraseBuffer = createPhraseBuffer((text) => {
           if (llmFirstTokenMs === null) {
             llmFirstTokenMs = elapsedMs(startedAt);
@@ -1273,6 +1359,7 @@ function buildServer() {
           result = await app.assistant.generateReplyStream({
             userText: transcript,
             history,
+            summary: session.summary,
             vectorStoreId: defaultVectorStoreId,
             signal: activeReplyAbortController.signal,
             onRetrievalDone: (payload) => {
@@ -1284,14 +1371,17 @@ function buildServer() {
                 markRetrievalDone([]);
               }
               phraseBuffer.push(delta);
+              sentenceBuffer.push(delta);
             }
           });
         } catch (error) {
-          if (activeReplyAbortController.signal.aborted) {
+          if (closed || (activeReplyAbortController.signal.aborted && !heldBack)) {
             return;
           }
 
-          app.log.error({ err: error }, "Assistant failed during websocket session");
+          if (!heldBack) {
+            app.log.error({ err: error }, "Assistant failed during websocket session");
+          }
           result = {
             decision: "handoff",
             reply: DEFAULT_HANDOFF_REPLY,
@@ -1307,7 +1397,22 @@ function buildServer() {
         }
         phraseBuffer.flush();
 
-        app.sessionStore.addTurn(sessionId, "assistant", result.reply);
+        if (result.decision === "answer") {
+          sentenceBuffer.flush();
+        }
+        if (heldBack) {
+          result = {
+            decision: "handoff",
+            reply: handoffMessageFor(transcript),
+            citations: []
+          };
+        }
+        if (result.decision !== "answer") {
+          sentenceBuffer.clear();
+          speak(result.reply);
+        }
+
+        recordTurn(sessionId, "assistant", result.reply);
 
         sendSocketEvent({
           event: "assistant_response",
@@ -1337,6 +1442,9 @@ function buildServer() {
           "Websocket assistant response completed"
         );
 
+        // Let queued speech finish before the next turn or the transfer mark.
+        await speechChain;
+
         if (result.decision === "handoff") {
           if (socket.readyState === WebSocket.OPEN && streamSid) {
             socket.send(
@@ -1362,7 +1470,16 @@ function buildServer() {
         }
       };
 
+      const turnQueue = createTurnQueue(handleTranscript, {
+        debounceMs: config.TRANSCRIPT_DEBOUNCE_MS,
+        onError: (error) => {
+          app.log.error({ err: error }, "Transcript queue failed");
+        }
+      });
+
       deepgramSocket.on("message", (raw) => {
+        if (!isUsefulDeepgramMessage(raw, { finalOnly: true })) return;
+
         const parsed = parseJsonSafe(raw.toString("utf8"));
         if (!parsed) return;
 
@@ -1373,11 +1490,7 @@ function buildServer() {
           return;
         }
 
-        queue = queue
-          .then(() => handleTranscript(transcript))
-          .catch((error) => {
-            app.log.error({ err: error }, "Transcript queue failed");
-          });
+        turnQueue.push(transcript);
       });
 
       deepgramSocket.on("error", (error) => {
@@ -1394,19 +1507,27 @@ function buildServer() {
           return;
         }
 
-        const message = raw.toString("utf8");
-        if (Buffer.byteLength(message, "utf8") > MAX_WS_MESSAGE_BYTES) {
+        if (raw.length > MAX_WS_MESSAGE_BYTES) {
           closeWs(socket, 1009, "Message too large");
           return;
         }
 
-        const parsed = parseJsonSafe(message);
+        const mediaAudio = extractTwilioMediaAudio(raw);
+        if (mediaAudio) {
+          if (mediaAudio.length && mediaAudio.length <= MAX_AUDIO_BYTES && deepgramSocket.readyState === WebSocket.OPEN) {
+            audioBatcher.push(mediaAudio);
+          }
+          return;
+        }
+
+        const parsed = parseJsonSafe(raw.toString("utf8"));
         if (!parsed || typeof parsed !== "object") {
           return;
         }
 
         if (parsed.event === "start") {
           streamSid = parsed.start?.streamSid || streamSid;
+          encodeMediaFrame = streamSid ? createMediaFrameEncoder(streamSid) : null;
           return;
         }
 
@@ -1421,11 +1542,12 @@ function buildServer() {
             return;
           }
 
-          deepgramSocket.send(audio);
+          audioBatcher.push(audio);
           return;
         }
 
         if (parsed.event === "stop") {
+          audioBatcher.flush();
           safeClose();
         }
       });
@@ -1446,7 +1568,12 @@ function buildServer() {
     );
   });
 
+  app.addHook("onReady", async () => {
+    app.deepgramPool.start();
+  });
+
   app.addHook("onClose", async () => {
+    app.deepgramPool.close();
     app.sessionStore.close();
   });
 
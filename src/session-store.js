@@ -1,3 +1,16 @@
+// Every session gets the same fields in the same order so V8 keeps a single
+// hidden class for them, even with thousands of concurrent calls.
+function createSession() {
+  return {
+    history: [],
+    summary: "",
+    pendingSummaryTurns: [],
+    summaryTask: null,
+    summaryAbortController: null,
+    lastSeenAt: Date.now()
+  };
+}
+
 class SessionStore {
   constructor(maxTurns) {
     this.maxTurns = maxTurns;
@@ -11,7 +24,7 @@ class SessionStore {
   get(sessionId) {
     const session = this.sessions.get(sessionId);
     if (!session) {
-      return { history: [] };
+      return createSession();
     }
 
     session.lastSeenAt = Date.now();
@@ -19,23 +32,43 @@ class SessionStore {
   }
 
   addTurn(sessionId, role, content) {
-    const session = this.sessions.get(sessionId) ?? { history: [], lastSeenAt: Date.now() };
+    const session = this.sessions.get(sessionId) ?? createSession();
 
+    // Fixed FIFO window of the last maxTurns exchanges, trimmed in place.
+    // Only whole user/assistant pairs are evicted, so the window never
+    // starts with an answer whose question is gone.
     session.history.push({ role, content });
     const maxMessages = this.maxTurns * 2;
-    if (session.history.length > maxMessages) {
-      session.history = session.history.slice(session.history.length - maxMessages);
+    const evicted = [];
+    while (session.history.length - maxMessages >= 2) {
+      evicted.push(...session.history.splice(0, 2));
     }
 
     session.lastSeenAt = Date.now();
     this.sessions.set(sessionId, session);
+    return evicted;
+  }
+
+  setSummary(sessionId, summary) {
+    const session = this.sessions.get(sessionId);
+    if (session) {
+      session.summary = summary;
+    }
+  }
+
+  delete(sessionId) {
+    const session = this.sessions.get(sessionId);
+    if (session) {
+      session.summaryAbortController?.abort();
+      this.sessions.delete(sessionId);
+    }
   }
 
   cleanup(maxAgeMs = 30 * 60 * 1000) {
     const now = Date.now();
     for (const [id, session] of this.sessions.entries()) {
       if (now - session.lastSeenAt > maxAgeMs) {
-        this.sessions.delete(id);
+        this.delete(id);
       }
     }
   }
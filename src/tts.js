@@ -0,0 +1,143 @@
+const crypto = require("node:crypto");
+
+const { createMulawEncoder } = require("./audio");
+
+// Raw PCM avoids an MP3 encode/decode round trip; it is converted here to
+// the 8 kHz mu-law Twilio plays, which is also what gets cached.
+const RESPONSE_FORMAT = "pcm";
+const OUTPUT_FORMAT = "mulaw_8000";
+
+class SpeechSynthesizer {
+  constructor(config, logger) {
+    this.config = config;
+    this.logger = logger;
+    // Greetings, confirmations and handoff messages repeat across calls.
+    this.cache = new Map();
+  }
+
+  get enabled() {
+    return Boolean(
+      this.config.AZURE_OPENAI_TTS_DEPLOYMENT && this.config.AZURE_OPENAI_ENDPOINT && this.config.AZURE_OPENAI_API_KEY
+    );
+  }
+
+  requestUrl() {
+    const endpoint = this.config.AZURE_OPENAI_ENDPOINT.replace(/\/$/, "");
+    const deployment = encodeURIComponent(this.config.AZURE_OPENAI_TTS_DEPLOYMENT);
+    return `${endpoint}/openai/deployments/${deployment}/audio/speech?api-version=${encodeURIComponent(
+      this.config.AZURE_OPENAI_TTS_API_VERSION
+    )}`;
+  }
+
+  cacheKey(text) {
+    return crypto
+      .createHash("sha256")
+      .update(
+        `${this.config.AZURE_OPENAI_TTS_DEPLOYMENT}|${this.config.AZURE_OPENAI_TTS_VOICE}|${OUTPUT_FORMAT}|${text}`
+      )
+      .digest("hex");
+  }
+
+  getCached(key) {
+    const audio = this.cache.get(key);
+    if (!audio) return null;
+
+    // Refresh recency so frequently spoken phrases survive eviction.
+    this.cache.delete(key);
+    this.cache.set(key, audio);
+    return audio;
+  }
+
+  setCached(key, audio) {
+    if (this.config.AZURE_OPENAI_TTS_CACHE_MAX_ENTRIES <= 0) {
+      return;
+    }
+
+    this.cache.set(key, audio);
+    while (this.cache.size > this.config.AZURE_OPENAI_TTS_CACHE_MAX_ENTRIES) {
+      const oldestKey = this.cache.keys().next().value;
+      this.cache.delete(oldestKey);
+    }
+  }
+
+  // Resolves once response headers arrive to an async iterable of mu-law
+  // chunks, so playback can start on the first bytes instead of the last.
+  async synthesizeStream(text, { signal } = {}) {
+    const key = this.cacheKey(text);
+    const cached = this.getCached(key);
+    if (cached) {
+      return [cached];
+    }
+
+    // The timeout covers the wait for headers and then each wait for the
+    // next chunk, never the time the body sits unread while earlier
+    // sentences are still playing.
+    const timeoutController = new AbortController();
+    const timeoutMs = this.config.AZURE_OPENAI_REQUEST_TIMEOUT_MS;
+    const headersTimer = setTimeout(() => timeoutController.abort(new Error("Speech request timed out")), timeoutMs);
+    let response;
+    try {
+      response = await fetch(this.requestUrl(), {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          "api-key": this.config.AZURE_OPENAI_API_KEY
+        },
+        body: JSON.stringify({
+          model: this.config.AZURE_OPENAI_TTS_DEPLOYMENT,
+          voice: this.config.AZURE_OPENAI_TTS_VOICE,
+          input: text,
+          response_format: RESPONSE_FORMAT
+        }),
+        signal: signal ? AbortSignal.any([timeoutController.signal, signal]) : timeoutController.signal
+      });
+
+      if (!response.ok) {
+        const body = await response.text();
+        throw new Error(`Azure OpenAI speech request failed (${response.status}): ${body.slice(0, 300)}`);
+      }
+    } finally {
+      clearTimeout(headersTimer);
+    }
+
+    if (!response.body) {
+      throw new Error("Azure OpenAI speech request returned no response body");
+    }
+
+    return this.readAudio(response.body, key, timeoutController, timeoutMs);
+  }
+
+  async *readAudio(body, key, timeoutController, timeoutMs) {
+    const encoder = createMulawEncoder();
+    const chunks = [];
+    const reader = body[Symbol.asyncIterator]();
+
+    try {
+      while (true) {
+        const idleTimer = setTimeout(() => timeoutController.abort(new Error("Speech stream stalled")), timeoutMs);
+        let next;
+        try {
+          next = await reader.next();
+        } finally {
+          clearTimeout(idleTimer);
+        }
+        if (next.done) {
+          break;
+        }
+
+        const pcm = next.value;
+        const audio = encoder.push(Buffer.from(pcm.buffer, pcm.byteOffset, pcm.byteLength));
+        if (audio.length) {
+          chunks.push(audio);
+          yield audio;
+        }
+      }
+    } finally {
+      await reader.return?.();
+    }
+
+    this.setCached(key, Buffer.concat(chunks));
+  }
+}
+
+module.exports = { SpeechSynthesizer };
@@ -0,0 +1,47 @@
+// Runs transcripts one at a time per call so replies never overlap or race on
+// session history. Transcripts that arrive within debounceMs of each other,
+// or while a reply is running, are joined into a single turn, so at most one
+// turn is ever waiting; its length is bounded by MAX_USER_TEXT_CHARS when
+// the backend sanitizes it.
+function createTurnQueue(handle, options = {}) {
+  const debounceMs = Number.isInteger(options.debounceMs) ? options.debounceMs : 0;
+  const onError = typeof options.onError === "function" ? options.onError : () => {};
+  const pending = [];
+  let running = false;
+  let timer = null;
+
+  const drain = async () => {
+    running = true;
+    while (pending.length) {
+      const text = pending.splice(0).join(" ");
+      try {
+        await handle(text);
+      } catch (error) {
+        onError(error);
+      }
+    }
+    running = false;
+  };
+
+  return {
+    push(item) {
+      pending.push(item);
+      if (running) {
+        return;
+      }
+
+      clearTimeout(timer);
+      timer = setTimeout(() => {
+        timer = null;
+        drain();
+      }, debounceMs);
+    },
+    clear() {
+      clearTimeout(timer);
+      timer = null;
+      pending.length = 0;
+    }
+  };
+}
+
+module.exports = { createTurnQueue };
@@ -0,0 +1,57 @@
+const assert = require("node:assert/strict");
+const { test } = require("node:test");
+
+const { createMulawEncoder, linearToMulaw } = require("../src/audio");
+
+function pcm(...samples) {
+  const buffer = Buffer.alloc(samples.length * 2);
+  samples.forEach((sample, index) => buffer.writeInt16LE(sample, index * 2));
+  return buffer;
+}
+
+test("encodes known G.711 mu-law values", () => {
+  // Reference values from Python's audioop.lin2ulaw.
+  const expected = new Map([
+    [0, 255],
+    [1, 255],
+    [-1, 126],
+    [-2, 126],
+    [100, 242],
+    [-100, 114],
+    [1000, 206],
+    [-1000, 78],
+    [8000, 160],
+    [-8000, 32],
+    [32767, 128]
+  ]);
+
+  for (const [sample, code] of expected) {
+    assert.equal(linearToMulaw(sample), code, `sample ${sample}`);
+  }
+});
+
+test("clips full-scale negative samples", () => {
+  assert.equal(linearToMulaw(-32768), 0);
+  assert.equal(linearToMulaw(-32767), 0);
+});
+
+test("averages each group of three samples into one output byte", () => {
+  const encoder = createMulawEncoder();
+
+  const output = encoder.push(pcm(900, 1000, 1100, -1000, -1000, -1000));
+
+  assert.deepEqual([...output], [206, 78]);
+});
+
+test("carries partial sample groups across pushes", () => {
+  const whole = createMulawEncoder().push(pcm(100, 200, 300, -400, -500, -600, 7000));
+  const input = pcm(100, 200, 300, -400, -500, -600, 7000);
+  const encoder = createMulawEncoder();
+
+  // Split mid-sample and mid-group.
+  const parts = [encoder.push(input.subarray(0, 3)), encoder.push(input.subarray(3, 8)), encoder.push(input.subarray(8))];
+
+  assert.deepEqual(Buffer.concat(parts), whole);
+  assert.equal(whole.length, 2);
+  assert.deepEqual([...encoder.push(pcm(7000, 7000))], [linearToMulaw(7000)]);
+});
@@ -0,0 +1,101 @@
+const assert = require("node:assert/strict");
+const { test } = require("node:test");
+
+const {
+  createAudioBatcher,
+  createMediaFrameEncoder,
+  extractTwilioMediaAudio,
+  isUsefulDeepgramMessage
+} = require("../src/media-frames");
+
+const frame = (value) => Buffer.from(JSON.stringify(value));
+
+test("extracts the audio from a Twilio media frame", () => {
+  const audio = Buffer.from([0xff, 0x7f, 0x00, 0x80, 0x12]);
+  const raw = frame({
+    event: "media",
+    sequenceNumber: "3",
+    media: { track: "inbound", chunk: "2", timestamp: "5", payload: audio.toString("base64") },
+    streamSid: "MZ18ad3ab5a668481ce02b83e7395059f0"
+  });
+
+  assert.deepEqual(extractTwilioMediaAudio(raw), audio);
+});
+
+test("ignores frames that are not media or have no complete payload", () => {
+  assert.equal(extractTwilioMediaAudio(frame({ event: "start", start: { streamSid: "MZ1" } })), null);
+  assert.equal(extractTwilioMediaAudio(frame({ event: "media", media: { track: "inbound" } })), null);
+  assert.equal(extractTwilioMediaAudio(Buffer.from('{"event":"media","media":{"payload":"/38AgBI')), null);
+  assert.equal(extractTwilioMediaAudio('{"event":"media"}'), null);
+});
+
+test("round-trips outbound audio through the media frame template", () => {
+  const encode = createMediaFrameEncoder("MZ1");
+  const audio = Buffer.from([1, 2, 3, 250]);
+
+  const message = JSON.parse(encode(audio));
+
+  assert.deepEqual(message, { event: "media", streamSid: "MZ1", media: { payload: audio.toString("base64") } });
+  assert.deepEqual(extractTwilioMediaAudio(Buffer.from(encode(audio))), audio);
+});
+
+test("filters Deepgram messages that cannot carry a transcript", () => {
+  const result = (transcript, isFinal) =>
+    frame({
+      type: "Results",
+      is_final: isFinal,
+      speech_final: isFinal,
+      channel: { alternatives: [{ transcript, confidence: 0.9 }] }
+    });
+
+  assert.equal(isUsefulDeepgramMessage(frame({ type: "Metadata", request_id: "abc", channels: 1 })), false);
+  assert.equal(isUsefulDeepgramMessage(frame({ type: "SpeechStarted", timestamp: 1.2 })), false);
+  assert.equal(isUsefulDeepgramMessage(result("", true)), false);
+  assert.equal(isUsefulDeepgramMessage(result("hello there", true)), true);
+  assert.equal(isUsefulDeepgramMessage(result("hello", false)), true);
+  assert.equal(isUsefulDeepgramMessage(result("hello", false), { finalOnly: true }), false);
+  assert.equal(isUsefulDeepgramMessage(result("hello there", true), { finalOnly: true }), true);
+  assert.equal(isUsefulDeepgramMessage("not a buffer"), true);
+});
+
+test("flushes batched audio once the size limit is reached", (t) => {
+  t.mock.timers.enable({ apis: ["setTimeout"] });
+  const chunks = [];
+  const batcher = createAudioBatcher((chunk) => chunks.push(chunk), { maxBytes: 4, maxDelayMs: 100 });
+
+  batcher.push(Buffer.from([1, 2, 3]));
+  batcher.push(Buffer.from([4, 5, 6, 7, 8, 9]));
+
+  assert.deepEqual(chunks, [Buffer.from([1, 2, 3, 4]), Buffer.from([5, 6, 7, 8])]);
+
+  t.mock.timers.tick(100);
+  assert.deepEqual(chunks[2], Buffer.from([9]));
+});
+
+test("flushes a partial batch when the timer fires", (t) => {
+  t.mock.timers.enable({ apis: ["setTimeout"] });
+  const chunks = [];
+  const batcher = createAudioBatcher((chunk) => chunks.push(chunk), { maxBytes: 800, maxDelayMs: 100 });
+
+  batcher.push(Buffer.from([1, 2]));
+  t.mock.timers.tick(99);
+  assert.deepEqual(chunks, []);
+
+  t.mock.timers.tick(1);
+  assert.deepEqual(chunks, [Buffer.from([1, 2])]);
+
+  batcher.push(Buffer.from([3]));
+  batcher.clear();
+  t.mock.timers.tick(100);
+  assert.equal(chunks.length, 1);
+});
+
+test("flushed chunks are not overwritten by later audio", () => {
+  const chunks = [];
+  const batcher = createAudioBatcher((chunk) => chunks.push(chunk), { maxBytes: 2, maxDelayMs: 100 });
+
+  batcher.push(Buffer.from([1, 2]));
+  batcher.push(Buffer.from([3, 4]));
+
+  assert.deepEqual(chunks, [Buffer.from([1, 2]), Buffer.from([3, 4])]);
+});
@@ -0,0 +1,44 @@
+const assert = require("node:assert/strict");
+const { test } = require("node:test");
+
+const { createSentenceBuffer } = require("../src/reply-buffers");
+
+test("emits sentences as soon as they complete across deltas", () => {
+  const sentences = [];
+  const buffer = createSentenceBuffer((sentence) => sentences.push(sentence));
+
+  for (const delta of ["The clinic ", "opens at 9", ". It", " closes at 5! Ca", "ll ahead?"]) {
+    buffer.push(delta);
+  }
+  // "?" only ends a sentence once the following whitespace arrives.
+  assert.deepEqual(sentences, ["The clinic opens at 9.", "It closes at 5!"]);
+
+  buffer.push(" Thanks");
+  assert.deepEqual(sentences, ["The clinic opens at 9.", "It closes at 5!", "Call ahead?"]);
+
+  buffer.push(" for calling.");
+  buffer.flush();
+  assert.deepEqual(sentences, ["The clinic opens at 9.", "It closes at 5!", "Call ahead?", "Thanks for calling."]);
+});
+
+test("does not split on a period without following whitespace", () => {
+  const sentences = [];
+  const buffer = createSentenceBuffer((sentence) => sentences.push(sentence));
+
+  buffer.push("Visit neu.edu.tr for hours");
+  buffer.push("\nCardiology is on floor 2.");
+  buffer.flush();
+
+  assert.deepEqual(sentences, ["Visit neu.edu.tr for hours", "Cardiology is on floor 2."]);
+});
+
+test("clear drops the unfinished sentence", () => {
+  const sentences = [];
+  const buffer = createSentenceBuffer((sentence) => sentences.push(sentence));
+
+  buffer.push("Take two tablets");
+  buffer.clear();
+  buffer.flush();
+
+  assert.deepEqual(sentences, []);
+});
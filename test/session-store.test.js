@@ -0,0 +1,73 @@
+const assert = require("node:assert/strict");
+const { test } = require("node:test");
+
+const { SessionStore } = require("../src/session-store");
+const { promptHistory } = require("../src/policy");
+
+test("evicts whole user/assistant pairs once the window is full", (t) => {
+  const store = new SessionStore(2);
+  t.after(() => store.close());
+  const evicted = [];
+
+  for (let turn = 0; turn < 4; turn += 1) {
+    evicted.push(...store.addTurn("s", "user", `u${turn}`));
+    evicted.push(...store.addTurn("s", "assistant", `a${turn}`));
+  }
+
+  assert.deepEqual(
+    evicted.map((m) => m.content),
+    ["u0", "a0", "u1", "a1"]
+  );
+  assert.deepEqual(
+    store.get("s").history.map((m) => m.content),
+    ["u2", "a2", "u3", "a3"]
+  );
+});
+
+test("keeps a pending question with its window intact", (t) => {
+  const store = new SessionStore(1);
+  t.after(() => store.close());
+
+  store.addTurn("s", "user", "u0");
+  store.addTurn("s", "assistant", "a0");
+  const evicted = store.addTurn("s", "user", "u1");
+
+  assert.deepEqual(evicted, []);
+  assert.deepEqual(
+    store.get("s").history.map((m) => m.content),
+    ["u0", "a0", "u1"]
+  );
+});
+
+test("a zero-turn window stores and sends no history", (t) => {
+  const store = new SessionStore(0);
+  t.after(() => store.close());
+
+  store.addTurn("s", "user", "u0");
+  const evicted = store.addTurn("s", "assistant", "a0");
+
+  assert.equal(evicted.length, 2);
+  assert.deepEqual(store.get("s").history, []);
+  assert.deepEqual(promptHistory([{ role: "user", content: "u0" }], 0), []);
+});
+
+test("prompt history is capped at the configured window", () => {
+  const history = Array.from({ length: 12 }, (_, index) => ({
+    role: index % 2 ? "assistant" : "user",
+    content: String(index)
+  }));
+
+  assert.equal(promptHistory(history, 2).length, 4);
+});
+
+test("deleting a session aborts its pending summary", (t) => {
+  const store = new SessionStore(1);
+  t.after(() => store.close());
+  store.addTurn("s", "user", "u0");
+  const controller = new AbortController();
+  store.get("s").summaryAbortController = controller;
+
+  store.delete("s");
+
+  assert.equal(controller.signal.aborted, true);
+});
@@ -0,0 +1,63 @@
+const assert = require("node:assert/strict");
+const { test } = require("node:test");
+
+const { createTurnQueue } = require("../src/turn-queue");
+
+const flush = () => new Promise((resolve) => setImmediate(resolve));
+
+test("joins every fragment pushed within the debounce window", async (t) => {
+  t.mock.timers.enable({ apis: ["setTimeout"] });
+  const turns = [];
+  const queue = createTurnQueue(async (text) => turns.push(text), { debounceMs: 300 });
+
+  for (const fragment of ["My order", "number is", "four seven", "two nine", "and I need", "to reschedule"]) {
+    queue.push(fragment);
+    t.mock.timers.tick(200);
+  }
+  t.mock.timers.tick(300);
+  await flush();
+
+  assert.deepEqual(turns, ["My order number is four seven two nine and I need to reschedule"]);
+});
+
+test("joins everything said while a reply is running into the next turn", async (t) => {
+  t.mock.timers.enable({ apis: ["setTimeout"] });
+  const turns = [];
+  let finishReply;
+  const queue = createTurnQueue(
+    async (text) => {
+      turns.push(text);
+      if (turns.length === 1) {
+        await new Promise((resolve) => {
+          finishReply = resolve;
+        });
+      }
+    },
+    { debounceMs: 300 }
+  );
+
+  queue.push("first");
+  t.mock.timers.tick(300);
+  await flush();
+
+  for (const fragment of ["actually", "I meant", "the cardiology", "department", "on Monday"]) {
+    queue.push(fragment);
+  }
+  finishReply();
+  await flush();
+
+  assert.deepEqual(turns, ["first", "actually I meant the cardiology department on Monday"]);
+});
+
+test("clear discards waiting fragments", async (t) => {
+  t.mock.timers.enable({ apis: ["setTimeout"] });
+  const turns = [];
+  const queue = createTurnQueue(async (text) => turns.push(text), { debounceMs: 300 });
+
+  queue.push("hello");
+  queue.clear();
+  t.mock.timers.tick(300);
+  await flush();
+
+  assert.deepEqual(turns, []);
+});